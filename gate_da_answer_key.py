@@ -1,5 +1,7 @@
 """Bundled official GATE DA answer key in normalized format."""
 
+import sys
+
 DA_ANSWER_KEY = {
     1: "B",
     2: "B",
@@ -67,3 +69,7 @@ DA_ANSWER_KEY = {
     64: "0.08:0.12",
     65: "1:1",
 }
+
+# Interned so evaluate_exam's MCQ/MSQ comparisons against the interned
+# parsed answers start with a pointer-equality check.
+DA_ANSWER_KEY = {q: sys.intern(v) for q, v in DA_ANSWER_KEY.items()}
@@ -13,11 +13,19 @@ Key features:
 from __future__ import annotations
 
 import argparse
+import os
+import pickle
 import re
 import subprocess
 import sys
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+try:  # optional: in-process PDF text extraction instead of forking gs
+    from pdfminer.high_level import extract_text as _pdf_extract_text  # type: ignore[import-not-found]
+except Exception:
+    _pdf_extract_text = None
 
 
 @dataclass
@@ -27,6 +35,61 @@ class Response:
     status: str
 
 
+class ExamSummary(TypedDict):
+    ga_marks: float
+    da_marks: float
+    total_marks: float
+    correct: int
+    wrong: int
+    unanswered: int
+
+
+class QuestionResult(TypedDict):
+    qnum: int
+    qtype: str
+    max_marks: int
+    your_answer: str
+    key_answer: str
+    earned: float
+    status: str
+    section: str
+
+
+class ExamReport(TypedDict):
+    summary: ExamSummary
+    results: List[QuestionResult]
+
+
+# Bits 1..65 set: the full set of GATE DA question numbers. Both parsers
+# track the questions they have inserted in a bitmask and compare against
+# this, so a partial parse names the missing questions instead of silently
+# mis-scoring the ones that did parse.
+_ALL_QUESTIONS_MASK = (1 << 66) - 2
+
+
+def _missing_questions(seen: int) -> List[int]:
+    return [q for q in range(1, 66) if not seen >> q & 1]
+
+
+# All patterns are compiled once at import; the parsers below are called
+# per request and should not rebuild them.
+_KEY_LINE_RE = re.compile(r"^\s*(\d+)\s+(MCQ|MSQ|NAT)\s+(GA|DA)\s+(.+?)\s*$")
+_NAT_RANGE_RE = re.compile(r"^([-+]?\d*\.?\d+)\s*to\s*([-+]?\d*\.?\d+)$", re.I)
+_Q_NUM_RE = re.compile(r"(?:daq(?P<da>\d+)|ga\d*q(?P<ga>\d+))q(?:v\d+)?\.png$", re.I)
+_QPANEL_START_RE = re.compile(r"<div class=\"question-pnl\"[^>]*>", re.I)
+_QIMG_RE = re.compile(r"<img[^>]*name=\"([^\"]+)\"[^>]*>", re.I)
+_QTYPE_RE = re.compile(r"Question Type\s*:</td>\s*<td[^>]*>\s*(MCQ|MSQ|NAT)\s*</td>", re.I)
+_STATUS_RE = re.compile(r"Status\s*:</td>\s*<td[^>]*>\s*([^<]+?)\s*</td>", re.I)
+_CHOSEN_RE = re.compile(r"Chosen Option\s*:</td>\s*<td[^>]*>\s*([^<]+?)\s*</td>", re.I)
+_GIVEN_RE = re.compile(r"Given Answer\s*:</td>\s*<td[^>]*>\s*([^<]+?)\s*</td>", re.I)
+# Example: A. <img name="..._daq25b.png" ...>
+_OPTION_MAP_RE = re.compile(
+    r"([ABCD])\.\s*<img[^>]*name=\"[^\"]*_(?:ga\d*q\d+|daq\d+)"
+    r"([abcd])(?:v\d+)?\.png\"",
+    re.I,
+)
+
+
 def run_ghostscript_txt(pdf_path: str) -> str:
     cmd = [
         "gs",
@@ -46,67 +109,102 @@ def run_ghostscript_txt(pdf_path: str) -> str:
     return out
 
 
+def pdf_to_text(pdf_path: str) -> str:
+    """Extract the PDF's text, in-process when pdfminer.six is installed.
+
+    pdfminer avoids the Ghostscript process spawn and pipe; Ghostscript
+    remains the fallback for deployments without the wheel (and for PDFs
+    pdfminer cannot handle).
+    """
+    if _pdf_extract_text is not None:
+        try:
+            return _pdf_extract_text(pdf_path)
+        except Exception:
+            pass
+    return run_ghostscript_txt(pdf_path)
+
+
+def _answer_key_cache_path(pdf_path: str) -> Optional[str]:
+    """Cache file path keyed on the PDF's size and mtime, or None if unstatable."""
+    try:
+        st = os.stat(pdf_path)
+    except OSError:
+        return None
+    return f"{pdf_path}.{st.st_size}.{st.st_mtime_ns}.pkl"
+
+
 def parse_answer_key_from_pdf(pdf_path: str) -> Dict[int, str]:
-    txt = run_ghostscript_txt(pdf_path)
+    # The key is static for a given exam, but Ghostscript costs hundreds of
+    # ms per run. Cache the parsed dict next to the PDF; the size/mtime in
+    # the filename invalidates the cache if the PDF is replaced.
+    cache_path = _answer_key_cache_path(pdf_path)
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # corrupt or unreadable cache; re-parse below
+
+    txt = pdf_to_text(pdf_path)
     key: Dict[int, str] = {}
-
-    line_re = re.compile(r"^\s*(\d+)\s+(MCQ|MSQ|NAT)\s+(GA|DA)\s+(.+?)\s*$")
+    seen = 0
 
     for raw in txt.splitlines():
         line = raw.strip()
         if not line:
             continue
-        m = line_re.match(line)
+        m = _KEY_LINE_RE.match(line)
         if not m:
             continue
 
         qnum = int(m.group(1))
+        if not 1 <= qnum <= 65:
+            continue
         qtype = m.group(2).upper()
         raw_key = m.group(4).strip()
 
+        # MCQ/MSQ values are interned: evaluate_exam compares them against
+        # the (also interned) parsed answers, so equal strings hit CPython's
+        # pointer-equality fast path.
         if qtype == "MCQ":
-            val = raw_key.upper()
+            val = sys.intern(raw_key.upper())
         elif qtype == "MSQ":
             vals = [x.strip().upper() for x in raw_key.split(";") if x.strip()]
-            val = ",".join(sorted(vals))
+            val = sys.intern(",".join(sorted(vals)))
         else:  # NAT
-            m_nat = re.match(r"^([-+]?\d*\.?\d+)\s*to\s*([-+]?\d*\.?\d+)$", raw_key, re.I)
+            m_nat = _NAT_RANGE_RE.match(raw_key)
             if m_nat:
                 val = f"{m_nat.group(1)}:{m_nat.group(2)}"
             else:
                 val = raw_key
 
         key[qnum] = val
+        seen |= 1 << qnum
+
+    if seen != _ALL_QUESTIONS_MASK:
+        raise ValueError(f"Answer key PDF is missing questions: {_missing_questions(seen)}")
 
-    if len(key) != 65:
-        raise ValueError(f"Parsed only {len(key)} answers from key PDF; expected 65.")
+    if cache_path is not None:
+        try:
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # read-only filesystem; caching is best-effort
 
     return key
 
 
 def _question_number_from_img_name(img_name: str) -> Optional[int]:
-    da = re.search(r"daq(\d+)q(?:v\d+)?\.png$", img_name, re.I)
-    if da:
-        return int(da.group(1))
+    m = _Q_NUM_RE.search(img_name)
+    return int(m.group("da") or m.group("ga")) if m else None
 
-    ga = re.search(r"ga\d*q(\d+)q(?:v\d+)?\.png$", img_name, re.I)
-    if ga:
-        return int(ga.group(1))
 
-    return None
-
-
-def _extract_option_map(block: str) -> Dict[str, str]:
+def _extract_option_map(html: str, start: int, end: int) -> Dict[str, str]:
     option_map: Dict[str, str] = {}
 
-    # Example: A. <img name="..._daq25b.png" ...>
-    patt = re.compile(
-        r"([ABCD])\.\s*<img[^>]*name=\"[^\"]*_(?:ga\d*q\d+|daq\d+)"
-        r"([abcd])(?:v\d+)?\.png\"",
-        re.I,
-    )
-
-    for disp, original in patt.findall(block):
+    for disp, original in _OPTION_MAP_RE.findall(html, start, end):
         option_map[disp.upper()] = original.upper()
 
     return option_map
@@ -114,57 +212,59 @@ def _extract_option_map(block: str) -> Dict[str, str]:
 
 def parse_response_html_text(html: str) -> Dict[int, Response]:
 
-    # Extract each question panel block by start marker. This is robust for minified HTML.
-    start_pat = re.compile(r"<div class=\"question-pnl\"[^>]*>", re.I)
-    starts = [m.start() for m in start_pat.finditer(html)]
-    blocks: List[str] = []
-    for i, st in enumerate(starts):
-        en = starts[i + 1] if i + 1 < len(starts) else len(html)
-        blocks.append(html[st:en])
+    # Locate each question panel by start marker. This is robust for minified HTML.
+    # Panels are processed as [start, end) windows of the original string;
+    # bounding the searches avoids copying each multi-KB panel out as its
+    # own substring.
+    starts = [m.start() for m in _QPANEL_START_RE.finditer(html)]
 
     responses: Dict[int, Response] = {}
+    seen = 0
+
+    for i, st in enumerate(starts):
+        en = starts[i + 1] if i + 1 < len(starts) else len(html)
 
-    for block in blocks:
-        qimg_match = re.search(r"<img[^>]*name=\"([^\"]+)\"[^>]*>", block, flags=re.I)
+        qimg_match = _QIMG_RE.search(html, st, en)
         if not qimg_match:
             continue
 
         qnum = _question_number_from_img_name(qimg_match.group(1))
-        if qnum is None:
+        if qnum is None or not 1 <= qnum <= 65:
             continue
 
-        qtype_match = re.search(r"Question Type\s*:</td>\s*<td[^>]*>\s*(MCQ|MSQ|NAT)\s*</td>", block, flags=re.I)
-        status_match = re.search(r"Status\s*:</td>\s*<td[^>]*>\s*([^<]+?)\s*</td>", block, flags=re.I)
-        chosen_match = re.search(r"Chosen Option\s*:</td>\s*<td[^>]*>\s*([^<]+?)\s*</td>", block, flags=re.I)
-        given_match = re.search(r"Given Answer\s*:</td>\s*<td[^>]*>\s*([^<]+?)\s*</td>", block, flags=re.I)
-
+        qtype_match = _QTYPE_RE.search(html, st, en)
         if not qtype_match:
             continue
 
+        status_match = _STATUS_RE.search(html, st, en)
+
         qtype = qtype_match.group(1).upper()
         status = status_match.group(1).strip() if status_match else ""
 
         answer: Optional[str] = None
 
         if qtype in {"MCQ", "MSQ"}:
+            chosen_match = _CHOSEN_RE.search(html, st, en)
             chosen = chosen_match.group(1).strip() if chosen_match else "--"
             if chosen != "--":
-                option_map = _extract_option_map(block)
+                option_map = _extract_option_map(html, st, en)
                 picked = [x.strip().upper() for x in chosen.split(",") if x.strip()]
                 mapped = [option_map[p] for p in picked if p in option_map]
                 if qtype == "MCQ":
-                    answer = mapped[0] if mapped else None
+                    answer = sys.intern(mapped[0]) if mapped else None
                 else:
-                    answer = ",".join(sorted(set(mapped))) if mapped else None
+                    answer = sys.intern(",".join(sorted(set(mapped)))) if mapped else None
         else:  # NAT
+            given_match = _GIVEN_RE.search(html, st, en)
             given = given_match.group(1).strip() if given_match else "--"
             if given != "--":
                 answer = given
 
         responses[qnum] = Response(qtype=qtype, answer=answer, status=status)
+        seen |= 1 << qnum
 
-    if len(responses) != 65:
-        raise ValueError(f"Parsed only {len(responses)} responses from HTML; expected 65.")
+    if seen != _ALL_QUESTIONS_MASK:
+        raise ValueError(f"Response sheet is missing questions: {_missing_questions(seen)}")
 
     return responses
 
@@ -175,14 +275,22 @@ def parse_response_html(html_path: str) -> Dict[int, Response]:
     return parse_response_html_text(html)
 
 
+# GA 1-5 and DA 11-35 are 1-mark; GA 6-10 and DA 36-65 are 2-mark.
+# Indexed by qnum-1 so the scorer's inner loop is a plain tuple lookup.
+_MARKS_TABLE = tuple(1 if q <= 5 else 2 if q <= 10 else 1 if q <= 35 else 2 for q in range(1, 66))
+
+
 def get_marks(qnum: int) -> int:
-    if qnum <= 5:
-        return 1
-    if qnum <= 10:
-        return 2
-    if qnum <= 35:
-        return 1
-    return 2
+    return _MARKS_TABLE[qnum - 1]
+
+
+@lru_cache(maxsize=256)
+def _parse_nat_key(key_ans: str) -> Tuple[float, ...]:
+    """Parse a NAT key once: (low, high) for a range, (exact,) otherwise."""
+    if ":" in key_ans:
+        low, high = key_ans.split(":", 1)
+        return (float(low), float(high))
+    return (float(key_ans),)
 
 
 def check_nat(your_ans: str, key_ans: str) -> bool:
@@ -191,14 +299,14 @@ def check_nat(your_ans: str, key_ans: str) -> bool:
     except (ValueError, TypeError):
         return False
 
-    if ":" in key_ans:
-        low, high = key_ans.split(":", 1)
-        return float(low) <= your_val <= float(high)
+    parsed = _parse_nat_key(key_ans)
+    if len(parsed) == 2:
+        return parsed[0] <= your_val <= parsed[1]
 
-    return abs(your_val - float(key_ans)) < 0.01
+    return abs(your_val - parsed[0]) < 0.01
 
 
-def evaluate_exam(answer_key: Dict[int, str], responses: Dict[int, Response]) -> Dict[str, object]:
+def evaluate_exam(answer_key: Dict[int, str], responses: Dict[int, Response]) -> ExamReport:
     total_marks = 0.0
     ga_marks = 0.0
     da_marks = 0.0
@@ -206,7 +314,7 @@ def evaluate_exam(answer_key: Dict[int, str], responses: Dict[int, Response]) ->
     wrong = 0
     unanswered = 0
 
-    results: List[Dict[str, object]] = []
+    results: List[QuestionResult] = []
 
     for qnum in range(1, 66):
         key = answer_key[qnum]
@@ -221,22 +329,22 @@ def evaluate_exam(answer_key: Dict[int, str], responses: Dict[int, Response]) ->
             status = "UNANSWERED"
             unanswered += 1
         elif resp.qtype == "MCQ":
-            if your_ans.upper() == key.upper():
+            if your_ans == key:
                 earned = float(q_marks)
                 status = "CORRECT"
                 correct += 1
             else:
                 earned = -q_marks / 3.0
-                status = f"WRONG (yours: {your_ans}, key: {key})"
+                status = "WRONG (yours: " + your_ans + ", key: " + key + ")"
                 wrong += 1
         elif resp.qtype == "MSQ":
-            if your_ans.upper() == key.upper():
+            if your_ans == key:
                 earned = float(q_marks)
                 status = "CORRECT"
                 correct += 1
             else:
                 earned = 0.0
-                status = f"WRONG (yours: {your_ans}, key: {key})"
+                status = "WRONG (yours: " + your_ans + ", key: " + key + ")"
                 wrong += 1
         else:  # NAT
             if check_nat(your_ans, key):
@@ -245,7 +353,7 @@ def evaluate_exam(answer_key: Dict[int, str], responses: Dict[int, Response]) ->
                 correct += 1
             else:
                 earned = 0.0
-                status = f"WRONG (yours: {your_ans}, key: {key})"
+                status = "WRONG (yours: " + your_ans + ", key: " + key + ")"
                 wrong += 1
 
         total_marks += earned
@@ -0,0 +1,143 @@
+"""Local SQLite fallback for the shared rank table.
+
+Used when neither ``REDIS_URL`` nor Vercel KV is configured, so local
+runs keep a persistent rank table instead of failing with "Storage
+unavailable". Connections run in WAL mode with one fsync per commit,
+and writes use ``BEGIN IMMEDIATE`` so concurrent requests queue on the
+write lock instead of failing with SQLITE_BUSY.
+
+Reads and writes use separate connections: a single writer guarded by a
+lock, plus a small pool of read-only connections (``RANK_DB_READERS``,
+default 4). Under WAL, readers never block on the writer, so leaderboard
+renders proceed while a submission is being committed.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+DB_PATH = Path(os.getenv("RANK_DB_PATH", str(Path(__file__).resolve().parent / "gate_da_ranks.sqlite3")))
+READER_POOL_SIZE = max(1, int(os.getenv("RANK_DB_READERS", "4") or 4))
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA foreign_keys=ON",
+)
+
+_SCHEMA = "CREATE TABLE IF NOT EXISTS ranks (id TEXT PRIMARY KEY, marks REAL NOT NULL)"
+# Covering index for the leaderboard ORDER BY and for get_rank's window scan.
+_INDEX = "CREATE INDEX IF NOT EXISTS idx_ranks_marks ON ranks(marks DESC, id)"
+
+_writer: sqlite3.Connection | None = None
+_writer_lock = threading.Lock()
+_reader_pool: queue.Queue[sqlite3.Connection] | None = None
+_pool_lock = threading.Lock()
+
+
+def _configure(conn: sqlite3.Connection) -> None:
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+
+
+def _connect(read_only: bool = False) -> sqlite3.Connection:
+    # isolation_level=None: transactions are issued explicitly below.
+    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False, isolation_level=None)
+    _configure(conn)
+    if read_only:
+        conn.execute("PRAGMA query_only=1")
+    return conn
+
+
+def _get_writer() -> sqlite3.Connection:
+    global _writer
+    if _writer is None:
+        _writer = _connect()
+        _writer.execute(_SCHEMA)
+        _writer.execute(_INDEX)
+    return _writer
+
+
+@contextmanager
+def _reader() -> Iterator[sqlite3.Connection]:
+    global _reader_pool
+    with _pool_lock:
+        if _reader_pool is None:
+            # The writer creates the schema before any reader opens.
+            with _writer_lock:
+                _get_writer()
+            pool: queue.Queue[sqlite3.Connection] = queue.Queue()
+            for _ in range(READER_POOL_SIZE):
+                pool.put(_connect(read_only=True))
+            _reader_pool = pool
+    conn = _reader_pool.get()
+    try:
+        yield conn
+    finally:
+        _reader_pool.put(conn)
+
+
+def load_rows() -> list[dict[str, object]]:
+    with _reader() as conn:
+        cur = conn.execute("SELECT id, marks FROM ranks ORDER BY marks DESC, id")
+        return [{"id": cid, "marks": marks} for cid, marks in cur.fetchall()]
+
+
+def get_rank(candidate_id: str) -> int | None:
+    """1-based leaderboard position for a candidate, computed in SQL.
+
+    Uses the same ORDER BY as :func:`load_rows`, so the returned position
+    matches the rendered table without a Python scan over all rows.
+    """
+    with _reader() as conn:
+        cur = conn.execute(
+            "SELECT rnk FROM ("
+            "SELECT id, ROW_NUMBER() OVER (ORDER BY marks DESC, id) AS rnk FROM ranks"
+            ") WHERE id = ?",
+            (candidate_id,),
+        )
+        row = cur.fetchone()
+        return int(row[0]) if row else None
+
+
+def upsert(candidate_id: str, marks: float) -> None:
+    with _writer_lock:
+        conn = _get_writer()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO ranks(id, marks) VALUES(?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET marks=excluded.marks",
+                (candidate_id, float(marks)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def replace_all(rows: list[dict[str, object]]) -> None:
+    with _writer_lock:
+        conn = _get_writer()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM ranks")
+            conn.executemany(
+                "INSERT INTO ranks(id, marks) VALUES(?, ?)",
+                [
+                    (cid, float(row.get("marks", 0) or 0))
+                    for row in rows
+                    if (cid := str(row.get("id", "")).strip())
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Optional mypyc build for the scoring module.
+
+The parsers and scorer in ``gate_da_marks_calculator`` are fully
+annotated pure-Python loops, which makes them good mypyc targets for
+CLI/self-hosted use:
+
+    pip install mypy
+    python setup_mypyc.py build_ext --inplace
+
+This drops a compiled extension next to the source; importing the
+module then loads the native version automatically, and removing the
+.so falls back to the interpreted module with identical behavior. The
+Vercel deployment keeps the pure-Python module — the serverless runtime
+ships no build toolchain and the bundle stays platform-independent.
+"""
+
+from setuptools import setup
+
+from mypyc.build import mypycify
+
+setup(
+    name="gate-da-marks-calculator-ext",
+    ext_modules=mypycify(["gate_da_marks_calculator.py"]),
+)